@@ -19,6 +19,9 @@ np.random.seed(1)
 # ------------ PARAMETERS ------------
 rank = 13 # (int) input rank for NMF and (S)SNMF models
 iterations = 11 # (odd int) number of iterations to run for analysis
+n_jobs = 1 # (int) number of analysis iterations to run in parallel processes (-1 uses all cores)
+n_threads = 1 # (int) number of models to fit concurrently (in threads) within each analysis iteration
+nnls_solver = "fpgm" # (str) test representation solver of (frobenius) NMF: 'fpgm' or 'exact' (see Methods.NMF)
 run_analysis = 1 # (boolean) run all methods to obtain class. acc./keywords/class. reports/heatmaps (reproduce paper results)
 nmf_search = 0 # (boolean) run for various tolerance values (reproduce paper results with iterations = 10)
 ssnmf_search = 0 # (boolean) run for various tolerances and regularizers (reproduce paper results with iterations = 10)
@@ -70,7 +73,8 @@ if run_analysis == 1:
 
     # Run SSNMF Analysis
     acc_dict, A_dict, B_dict, S_dict, S_test_dict, Yhat_dict, median_dict, iter_dict = evalualtion_module.run_analysis(ssnmf_tol= ssnmf_tol, \
-                                                                    nmf_tol = nmf_tol, i_nmf_tol = i_nmf_tol, lamb=lamb, ka=rank, itas=50, iterations=iterations)
+                                                                    nmf_tol = nmf_tol, i_nmf_tol = i_nmf_tol, lamb=lamb, ka=rank, itas=50, iterations=iterations, n_jobs=n_jobs, n_threads=n_threads, \
+                                                                    nnls_solver=nnls_solver)
 
     evalualtion_module.median_results(acc_dict, A_dict, B_dict, Yhat_dict, median_dict, iter_dict)
 
@@ -97,7 +101,8 @@ if nmf_search == 1:
             if nmf_model == "NMF":
                 for j in range(iterations):
                     print("Iteration {}.".format(j))
-                    nmf_svm_acc, W, nn_svm, nmf_svm_predicted, nmf_iter, H, H_test = evalualtion_module.NMF(rank=rank, nmf_tol=nmf_tol, beta_loss = "frobenius")
+                    nmf_svm_acc, W, nn_svm, nmf_svm_predicted, nmf_iter, H, H_test = evalualtion_module.NMF(rank=rank, nmf_tol=nmf_tol, beta_loss = "frobenius", \
+                                                                                                                         nnls_solver = nnls_solver)
                     nmf_acc.append(nmf_svm_acc)
 
             if nmf_model == "I_NMF":
@@ -1,19 +1,17 @@
 import ssnmf
 from ssnmf.evaluation  import Evaluation
 import numpy as np
-import pandas as pd
+from scipy import sparse
 from utils_20news import *
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import SGDClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.pipeline import Pipeline
 from sklearn.decomposition import NMF
-from scipy.optimize import nnls as nnls
 from sklearn import metrics
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits, threadpool_info
+from concurrent.futures import ThreadPoolExecutor
+import os
 import pickle
-from statistics import mean
-from statistics import median
-from statistics import stdev
 from utils_20news import *
 
 class Methods:
@@ -23,6 +21,10 @@ class Methods:
         """
         Class for all methods.
 
+        The sklearn methods use sparse (document, vocabulary) copies of X_train_full and X_test. These are built on
+        first use and kept next to the dense matrices (which SSNMF needs), so they add to the memory of the dense
+        data; they are not pickled, i.e. joblib workers only receive the dense matrices and rebuild the copies.
+
         Parameters:
             X_train (ndarray): tfidf train data matrix, shape (vocabulary size, number of train documents)
             X_val (ndarray): tfidf validation data matrix, shape (vocabulary size, number of val documents)
@@ -47,15 +49,37 @@ class Methods:
         self.cls_names = cls_names
         self.feature_names_train = feature_names_train
 
-        # One-hot encode labels
-        train_onehot_labels = pd.get_dummies(self.train_labels)
-        self.y_train = train_onehot_labels.T.to_numpy()
-        test_onehot_labels = pd.get_dummies(self.test_labels)
-        self.y_test = test_onehot_labels.T.to_numpy()
-        val_onehot_labels = pd.get_dummies(self.val_labels)
-        self.y_val = val_onehot_labels.T.to_numpy()
-        train_full_onehot_labels = pd.get_dummies(self.train_labels_full)
-        self.y_train_full = train_full_onehot_labels.T.to_numpy()
+        # Sparse (document, vocabulary) copies of the tfidf matrices for the sklearn methods, built on first use
+        self._X_train_full_csr = None
+        self._X_test_csr = None
+
+        # One-hot encode labels (rows indexed by the classes present in any of the label sets)
+        classes = np.unique(np.concatenate((self.train_labels, self.val_labels, self.test_labels, self.train_labels_full)))
+        self.y_train = onehot_encode(self.train_labels, classes)
+        self.y_test = onehot_encode(self.test_labels, classes)
+        self.y_val = onehot_encode(self.val_labels, classes)
+        self.y_train_full = onehot_encode(self.train_labels_full, classes)
+
+    @property
+    def X_train_full_csr(self):
+        """Sparse (document, vocabulary) copy of X_train_full."""
+        if self._X_train_full_csr is None:
+            self._X_train_full_csr = sparse.csr_matrix(self.X_train_full.T)
+        return self._X_train_full_csr
+
+    @property
+    def X_test_csr(self):
+        """Sparse (document, vocabulary) copy of X_test."""
+        if self._X_test_csr is None:
+            self._X_test_csr = sparse.csr_matrix(self.X_test.T)
+        return self._X_test_csr
+
+    def __getstate__(self):
+        # Do not ship the sparse copies to joblib workers, they rebuild them on first use
+        state = self.__dict__.copy()
+        state["_X_train_full_csr"] = None
+        state["_X_test_csr"] = None
+        return state
 
     def MultinomialNB(self, print_results=0):
         """
@@ -69,8 +93,8 @@ class Methods:
         """
 
         print("\nRunning Multinomial Naive Bayes.")
-        nb_clf = MultinomialNB().fit(self.X_train_full.T, self.train_labels_full)
-        nb_predicted = nb_clf.predict(self.X_test.T)
+        nb_clf = MultinomialNB().fit(self.X_train_full_csr, self.train_labels_full)
+        nb_predicted = nb_clf.predict(self.X_test_csr)
         nb_acc = np.mean(nb_predicted == self.test_labels)
 
         print("The classification accuracy on the test data is {:.4f}%\n".format(nb_acc*100))
@@ -82,33 +106,33 @@ class Methods:
 
         return nb_acc, nb_predicted
 
-    def SVM(self, print_results=0):
+    def SVM(self, print_results=0, n_jobs=-1):
         """
         Run SVM on the TFIDF representation of documents.
 
         Args:
             print_results (boolean): 1: print classification report, heatmaps, and features, 0:otherwise
+            n_jobs (int): number of CPUs used by the one-versus-all classifiers (-1: all CPUs)
         Retruns:
             svm_acc (float): classification accuracy on test set
             svm_predicted (ndarray): predicted labels for data points in test set
         """
 
         print("\nRunning SVM.")
-        svm_clf = Pipeline([('scl',StandardScaler()), \
-                    ('clf', SGDClassifier())])
-        svm_clf.fit(self.X_train_full.T, self.train_labels_full)
-        svm_predicted = svm_clf.predict(self.X_test.T)
+        svm_clf = SGDClassifier(loss='hinge', average=True, tol=1e-4, n_jobs=n_jobs)
+        svm_clf.fit(self.X_train_full_csr, self.train_labels_full)
+        svm_predicted = svm_clf.predict(self.X_test_csr)
         svm_acc = np.mean(svm_predicted == self.test_labels)
         print("The classification accuracy on the test data is {:.4f}%\n".format(svm_acc*100))
 
         if print_results == 1:
             # Extract features
-            top_features(svm_clf['clf'], self.feature_names_train, self.cls_names, top_num = 10)
+            top_features(svm_clf, self.feature_names_train, self.cls_names, top_num = 10)
             print(metrics.classification_report(self.test_labels, svm_predicted, target_names=self.cls_names))
 
         return svm_acc, svm_predicted
 
-    def NMF(self, rank, nmf_tol, beta_loss, print_results=0):
+    def NMF(self, rank, nmf_tol, beta_loss, print_results=0, nnls_solver="fpgm"):
         """
         Run NMF on the TFIDF representation of documents to obtain a low-dimensional representaion (dim=rank),
         then apply SVM to classify the data.
@@ -118,6 +142,9 @@ class Methods:
             nmf_tol (float): tolerance for termanating NMF model
             print_results (boolean): 1: print classification report, heatmaps, and keywords, 0:otherwise
             beta_loss (str): Beta divergence to be minimized (sklearn NMF parameter). Choose 'frobenius', or 'kullback-leibler'.
+            nnls_solver (str): solver for the (frobenius) test representation. Choose 'fpgm' (batched fast projected gradient),
+                                or 'exact' (active-set nnls, parallel over documents; compiled with numba if installed, which
+                                takes about 16 s on the first call).
         Retruns:
              nmf_svm_acc (float): classification accuracy on test set
              W (ndarray): learnt word dictionary matrix, shape (words, topics)
@@ -127,24 +154,23 @@ class Methods:
              H (ndarray): document representation matrix for train set, shape (topics, train documents)
              H_test (ndarray): document representation matrix for test set, shape (topics, test documents)
         """
-        self.nmf_tol = nmf_tol
-
         print("\nRunning NMF (" + beta_loss + ") SVM")
 
         # TRAINING STEP
         if beta_loss == "frobenius":
-            nmf = NMF(n_components=rank, init= 'random', tol = self.nmf_tol, beta_loss = beta_loss, solver = 'mu', max_iter = 400)
+            nmf = NMF(n_components=rank, init= 'nndsvda', tol = nmf_tol, beta_loss = beta_loss, solver = 'cd', max_iter = 400)
             # Dictionary matrix, shape (vocabulary, topics)
-            W = nmf.fit_transform(self.X_train_full)
+            W = nmf.fit_transform(self.X_train_full_csr.T)
             # Representation matrix, shape (topics, documents)
             H = nmf.components_
             # Actual number of iterations
             nmf_iter = nmf.n_iter_
 
         if beta_loss == "kullback-leibler":
-            nmf = NMF(n_components=rank, init= 'random', tol = self.nmf_tol, beta_loss = beta_loss, solver = 'mu', max_iter = 600)
+            nmf = NMF(n_components=rank, init= 'nndsvda', tol = nmf_tol, beta_loss = beta_loss, solver = 'mu', max_iter = 600)
             # Dictionary matrix, shape (vocabulary, topics)
-            W = nmf.fit_transform(self.X_train_full)
+            # (converted to CSR, the KL multiplicative updates of sklearn do not converge properly on CSC input)
+            W = nmf.fit_transform(self.X_train_full_csr.T.tocsr())
             # Representation matrix, shape (topics, documents)
             H = nmf.components_
             # Actual number of iterations
@@ -152,22 +178,21 @@ class Methods:
 
 
         # Train SVM classifier on train data
-        text_clf = Pipeline([('scl',StandardScaler()), \
-                                ('clf', SGDClassifier(tol=1e-5))])
+        text_clf = SGDClassifier(tol=1e-5, average=True)
         text_clf.fit(H.T, self.train_labels_full)
 
         # TESTING STEP
         # Compute the representation of test data
         if beta_loss == "frobenius":
-            H_test = np.zeros([rank, np.shape(self.X_test)[1]])
-            for i in range(np.shape(self.X_test)[1]):
-                H_test[:,i] = nnls(W, self.X_test[:,i])[0]
+            if nnls_solver == "fpgm":
+                H_test = nnls_fpgm(W, self.X_test_csr.T)
+            if nnls_solver == "exact":
+                H_test = nnls_columns(W, self.X_test_csr.T)
 
         if beta_loss == "kullback-leibler":
             H_test = np.random.rand(rank, np.shape(self.X_test)[1])
             for i in range(20):
-                H_test = np.transpose(dictupdateIdiv(Z = np.transpose(self.X_test), D = np.transpose(H_test), \
-                                       R = np.transpose(W), M = np.transpose(np.ones(self.X_test.shape)), eps= 1e-10))
+                H_test = repupdateIdiv(Z = self.X_test, D = W, R = H_test, eps = 1e-10)
 
         # Classify test data using trained SVM classifier
         nmf_svm_predicted = text_clf.predict(H_test.T)
@@ -176,19 +201,30 @@ class Methods:
         print("The classification accuracy on the test data is {:.4f}%\n".format(nmf_svm_acc*100))
 
         # SVM non-negaitve coefficient matrix
-        nn_svm = text_clf['clf'].coef_.copy()
+        nn_svm = text_clf.coef_.copy()
         nn_svm[nn_svm<0] = 0
 
         if print_results == 1:
-            # Extract top keywords representaion of topics
-            print_keywords(W.T, features=self.feature_names_train, top_num=10)
-            print(metrics.classification_report(self.test_labels, nmf_svm_predicted, target_names=self.cls_names))
-            factors_heatmaps(nn_svm, cls_names=self.cls_names)
+            self.NMF_report(W, nn_svm, nmf_svm_predicted)
 
         return nmf_svm_acc, W, nn_svm, nmf_svm_predicted, nmf_iter, H, H_test
 
+    def NMF_report(self, W, nn_svm, nmf_svm_predicted):
+        """
+        Print the keywords and classification report, and plot the heatmap of an NMF + SVM model.
+
+        Args:
+            W (ndarray): learnt word dictionary matrix, shape (words, topics)
+            nn_svm (ndarray): learnt (nonegative) coefficient matrix for SVM classification, shape (classes, topics)
+            nmf_svm_predicted (ndarray): predicted labels for data points in test set
+        """
+        # Extract top keywords representaion of topics
+        print_keywords(W.T, features=self.feature_names_train, top_num=10)
+        print(metrics.classification_report(self.test_labels, nmf_svm_predicted, target_names=self.cls_names))
+        factors_heatmaps(nn_svm, cls_names=self.cls_names)
+
 
-    def SSNMF(self, modelNum, ssnmf_tol, lamb, ka, itas, hyp_search = 0, print_results=0):
+    def SSNMF(self, modelNum, ssnmf_tol, lamb, ka, itas, hyp_search = 0, print_results=0, device=None):
         """
         Run (S)SNMF on the TFIDF representation of documents.
 
@@ -200,6 +236,7 @@ class Methods:
             itas (int): maximum number of multiplicative update iterations
             hyp_search (boolean): 0: run hyperparameter search algorithm, 1:otherwise
             print_results (boolean): 1: print classification report, heatmaps, and keywords, 0:otherwise
+            device (str): torch device (e.g. 'cuda') to train SSNMF on, None to train with numpy
         Retruns:
             test_evals(list): [float(total reconstruction error (model objective function) on test data),
                                     float(data reconstruction error on test data),
@@ -214,26 +251,23 @@ class Methods:
         """
 
         print("\nRunning SSNMF for Model {}.".format(modelNum))
-        self.ssnmf_tol = ssnmf_tol
-        self.hyp_search = hyp_search
-        self.modelNum = modelNum
 
-        if self.hyp_search == 0:
-            self.opt_ka = ka
-            self.opt_lamb = lamb
-            self.opt_itas = itas
+        if hyp_search == 0:
+            opt_ka = ka
+            opt_lamb = lamb
+            opt_itas = itas
         else:
             eval_module = Evaluation(train_features = self.X_train,
                                      train_labels = self.y_train,
                                      test_features = self.X_val, test_labels = self.y_val,
-                                     k = ka, modelNum = self.modelNum, tol = self.ssnmf_tol)
+                                     k = ka, modelNum = modelNum, tol = ssnmf_tol, device = device)
 
-            self.opt_lamb, self.opt_ka, self.opt_itas = eval_module.iterativeLocalSearch(init_lamb=lamb, init_k=ka, init_itas=itas)
+            opt_lamb, opt_ka, opt_itas = eval_module.successiveHalvingSearch(init_lamb=lamb, init_k=ka, init_itas=itas)
 
         eval_module = Evaluation(train_features = self.X_train_full,
                                  train_labels = self.y_train_full,
-                                 test_features = self.X_test, test_labels = self.y_test, tol = self.ssnmf_tol,
-                                 modelNum = self.modelNum, k = self.opt_ka, lam=self.opt_lamb, numiters = self.opt_itas)
+                                 test_features = self.X_test, test_labels = self.y_test, tol = ssnmf_tol,
+                                 modelNum = modelNum, k = opt_ka, lam=opt_lamb, numiters = opt_itas, device = device)
 
         train_evals, test_evals = eval_module.eval()
         ssnmf_iter = len(train_evals[0])
@@ -241,26 +275,89 @@ class Methods:
         #print(f"The classification accuracy on the train data is {train_evals[-1][-1]*100:.4f}%")
         print("The classification accuracy on the test data is {:.4f}%".format(test_evals[-1]*100))
 
-        Y_predicted = eval_module.model.B@eval_module.S_test
-        ssnmf_predicted = np.argmax(Y_predicted, axis=0)+1
+        ssnmf_predicted = predict_classes(eval_module.model.B, eval_module.S_test)+1
 
         S = eval_module.model.S
         S_test = eval_module.S_test
 
         if print_results == 1:
-            print(metrics.classification_report(self.test_labels, ssnmf_predicted, target_names=self.cls_names))
-            # Plot B matrix
-            factors_heatmaps(eval_module.model.B, cls_names=self.cls_names, save=True)
-            # Plot normalized B matrix
-            B_norm = eval_module.model.B/eval_module.model.B.sum(axis=0)[None,:]
-            factors_heatmaps(B_norm, cls_names=self.cls_names)
-            # Extract top keywords representaion of topics
-            print_keywords(eval_module.model.A.T, features=self.feature_names_train, top_num=10)
+            self.SSNMF_report(eval_module.model.A, eval_module.model.B, ssnmf_predicted)
 
         return test_evals, eval_module.model.A, eval_module.model.B, ssnmf_predicted, ssnmf_iter, S, S_test
 
+    def SSNMF_report(self, A, B, ssnmf_predicted):
+        """
+        Print the classification report and keywords, and plot the heatmaps of an SSNMF model.
 
-    def run_analysis(self, ssnmf_tol, nmf_tol, i_nmf_tol, lamb, ka, itas, iterations, print_results=0, hyp_search=0):
+        Args:
+            A (ndarray): learnt word dictionary matrix for data reconstruction, shape (words, topics)
+            B (ndarray): learnt dictionary matrix for classification, shape (classes, topics)
+            ssnmf_predicted (ndarray): predicted labels for data points in test set
+        """
+        print(metrics.classification_report(self.test_labels, ssnmf_predicted, target_names=self.cls_names))
+        # Plot B matrix
+        factors_heatmaps(B, cls_names=self.cls_names)
+        # Plot normalized B matrix
+        B_norm = B/B.sum(axis=0)[None,:]
+        factors_heatmaps(B_norm, cls_names=self.cls_names)
+        # Extract top keywords representaion of topics
+        print_keywords(A.T, features=self.feature_names_train, top_num=10)
+
+
+    def run_iteration(self, j, seed, ssnmf_tol, nmf_tol, i_nmf_tol, lamb, ka, itas, print_results=0, device=None, n_threads=1, \
+                      nnls_solver="fpgm"):
+        """
+        Run one iteration of the analysis, i.e. fit SSNMF Models [3,4,5,6], SVM, and NMF + SVM once.
+
+        Args:
+            j (int): iteration number
+            seed (int): seed of the numpy random number generator for this iteration
+            ssnmf_tol, nmf_tol, i_nmf_tol, lamb, ka, itas, print_results, device, n_threads, nnls_solver: see run_analysis
+        Returns:
+            results (dictionary): for each model, dictionary of the test accuracy ("acc"), predicted labels ("Yhat"), and
+                                  (if applicable) the matrices ("A", "B", "S", "S_test") and number of iterations ("iter")
+        """
+        print("Iteration {}.".format(j))
+        np.random.seed(seed)
+        results = {}
+
+        # Fit all models concurrently, sharing the BLAS threads (and the CPUs of the SVM) among the n_threads workers.
+        # The current limit is used rather than the number of CPUs, since a joblib worker (n_jobs > 1) already gets
+        # only its share of them
+        current_threads = max([pool["num_threads"] for pool in threadpool_info()], default=os.cpu_count() or 1)
+        model_threads = max(1, current_threads//n_threads)
+        blas_threads = None if n_threads == 1 else model_threads
+        with threadpool_limits(limits=blas_threads), ThreadPoolExecutor(max_workers=n_threads) as executor:
+            ssnmf_futures = {i: executor.submit(self.SSNMF, modelNum = i, ssnmf_tol = ssnmf_tol[i-3],lamb = lamb[i-3], ka = ka, itas= itas, \
+                                                hyp_search = self.hyp_search, device = device) for i in range(3,7)}
+            svm_future = executor.submit(self.SVM, n_jobs = model_threads)
+            nmf_futures = {"NMF": executor.submit(self.NMF, rank=ka, nmf_tol= nmf_tol, beta_loss = "frobenius", nnls_solver=nnls_solver),
+                           "I_NMF": executor.submit(self.NMF, rank=ka, nmf_tol= i_nmf_tol, beta_loss = "kullback-leibler")}
+
+        # Collect the results. They are reported here, on the calling thread, rather than by the models fit in the
+        # worker threads, since pyplot is not thread-safe
+        # SSNMF
+        for i in range(3,7):
+            test_evals, A, B, ssnmf_predicted, ssnmf_iter, S, S_test = ssnmf_futures[i].result()
+            results["Model" + str(i)] = {"acc": test_evals[-1], "A": A, "B": B, "S": S, "S_test": S_test, "Yhat": ssnmf_predicted, "iter": ssnmf_iter}
+            if print_results == 1:
+                self.SSNMF_report(A, B, ssnmf_predicted)
+
+        # SVM
+        svm_acc, svm_predicted = svm_future.result()
+        results["SVM"] = {"acc": svm_acc, "Yhat": svm_predicted}
+
+        # NMF + SVM
+        for nmf_model in ["NMF", "I_NMF"]:
+            nmf_svm_acc, W, nn_svm, nmf_svm_predicted, nmf_iter, H, H_test = nmf_futures[nmf_model].result()
+            results[nmf_model] = {"acc": nmf_svm_acc, "A": W, "B": nn_svm, "S": H, "S_test": H_test, "Yhat": nmf_svm_predicted, "iter": nmf_iter}
+            if print_results == 1:
+                self.NMF_report(W, nn_svm, nmf_svm_predicted)
+
+        return results
+
+    def run_analysis(self, ssnmf_tol, nmf_tol, i_nmf_tol, lamb, ka, itas, iterations, print_results=0, hyp_search=0, device=None, n_jobs=1, n_threads=1, \
+                     nnls_solver="fpgm"):
         """
         Compute and save all results for each iteration of each model.
 
@@ -274,109 +371,83 @@ class Methods:
             iterations (int): (odd) number of iterations to run for analysis
             print_results (boolean): 1: print classification report, heatmaps, and keywords, 0:otherwise
             hyp_search (boolean): 0: run hyperparameter search algorithm, 1:otherwise
+            device (str): torch device (e.g. 'cuda') to train SSNMF on, None to train with numpy
+            n_jobs (int): number of iterations to run in parallel processes (-1 uses all cores)
+            n_threads (int): number of models to fit concurrently (in threads) within each iteration
+            nnls_solver (str): solver for the test representation of the (frobenius) NMF model, 'fpgm' or 'exact' (see NMF)
         Returns:
-            acc_dict (dictionary): for each model, test accuracy for each iteration (list)
+            acc_dict (dictionary): for each model, test accuracy for each iteration (ndarray)
             A_dict (dictionary): for each model, word dictionary matrices for each iteration (list) (if applicable)
             B_dict (dictionary): for each model, classification dictionary matrices for each iteration (list) (if applicable)
             S_dict (dictionary): for each model, train (+test) document representaion matrices for each iteration (list) (if applicable)
             S_test_dict  (dictionary): for each model, test document representaion matrices for each iteration (list) (if applicable)
             Yhat_dict (dictionary): for each model, predicted labels for each iteration (list)
             median_dict (dictionary): for each model, indices of the median model for each model based on test accuracy
-            iter_dict (dictionary): for each model, number of multiplicative updates for each iteration (list) (if applicable)
+            iter_dict (dictionary): for each model, number of multiplicative updates for each iteration (ndarray) (if applicable)
 
         """
         print("\nRunning analysis.")
 
         self.hyp_search = hyp_search
-        acc_dict = {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": [], "NB": [], "SVM": []}
+        acc_dict = {model: np.empty(iterations) for model in ["Model3", "Model4", "Model5", "Model6", "NMF", "I_NMF", "SVM"]}
+        acc_dict["NB"] = np.empty(1)
         A_dict= {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": []}
         B_dict= {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": []}
         S_dict= {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": []}
         S_test_dict= {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": []}
         Yhat_dict = {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": [], "NB": [], "SVM": []}
-        iter_dict = {"Model3": [], "Model4": [], "Model5": [], "Model6": [], "NMF": [], "I_NMF": []}
-
-        # Construct an evaluation module
-        evalualtion_module = Methods(X_train = self.X_train, X_val = self.X_val, X_test = self.X_test,\
-                                train_labels = self.train_labels, val_labels = self.val_labels,\
-                                test_labels = self.test_labels, X_train_full = self.X_train_full,\
-                                train_labels_full = self.train_labels_full, cls_names = self.cls_names,\
-                                feature_names_train=self.feature_names_train)
+        iter_dict = {model: np.empty(iterations, dtype=int) for model in ["Model3", "Model4", "Model5", "Model6", "NMF", "I_NMF"]}
 
         # Run NB
-        nb_acc, nb_predicted = list(evalualtion_module.MultinomialNB())
-        acc_dict["NB"].append(nb_acc)
+        nb_acc, nb_predicted = list(self.MultinomialNB())
+        acc_dict["NB"][0] = nb_acc
         Yhat_dict["NB"].append(nb_predicted)
 
-        # Run all other methods
-        for j in range(iterations):
-            print("Iteration {}.".format(j))
-            # Run SSNMF
-            for i in range(3,7):
-                test_evals, A, B, ssnmf_predicted, ssnmf_iter, S, S_test = evalualtion_module.SSNMF(modelNum = i, ssnmf_tol = ssnmf_tol[i-3],lamb = lamb[i-3],\
-                                                                                        ka = ka, itas= itas, print_results = print_results, hyp_search = self.hyp_search)
-                acc_dict["Model" + str(i)].append(test_evals[-1])
-                A_dict["Model" + str(i)].append(A)
-                B_dict["Model" + str(i)].append(B)
-                S_dict["Model" + str(i)].append(S)
-                S_test_dict["Model" + str(i)].append(S_test)
-                Yhat_dict["Model" + str(i)].append(ssnmf_predicted)
-                iter_dict["Model" + str(i)].append(ssnmf_iter)
-
-            # Run SVM
-            svm_acc, svm_predicted = list(evalualtion_module.SVM())
-            acc_dict["SVM"].append(svm_acc)
-            Yhat_dict["SVM"].append(svm_predicted)
-
-            # Run NMF + SVM
-            for nmf_model in ["NMF", "I_NMF"]:
-                if nmf_model == "NMF":
-                    nmf_svm_acc, W, nn_svm, nmf_svm_predicted, nmf_iter, H, H_test = evalualtion_module.NMF(rank=ka, nmf_tol= nmf_tol, beta_loss = "frobenius", print_results=print_results)
-                if nmf_model == "I_NMF":
-                    nmf_svm_acc, W, nn_svm, nmf_svm_predicted, nmf_iter, H, H_test = evalualtion_module.NMF(rank=ka, nmf_tol= i_nmf_tol, beta_loss = "kullback-leibler", print_results=print_results)
-                acc_dict[nmf_model].append(nmf_svm_acc)
-                A_dict[nmf_model].append(W)
-                B_dict[nmf_model].append(nn_svm)
-                S_dict[nmf_model].append(H)
-                S_test_dict[nmf_model].append(H_test)
-                Yhat_dict[nmf_model].append(nmf_svm_predicted)
-                iter_dict[nmf_model].append(nmf_iter)
-
-
-            # Save all dictionaries
-            pickle.dump(acc_dict, open("acc_dict.pickle", "wb"))
-            pickle.dump(A_dict, open("A_dict.pickle", "wb"))
-            pickle.dump(B_dict, open("B_dict.pickle", "wb"))
-            pickle.dump(S_dict, open("S_dict.pickle", "wb"))
-            pickle.dump(S_test_dict, open("S_test_dict.pickle", "wb"))
-            pickle.dump(Yhat_dict, open("Yhat_dict.pickle", "wb"))
-            pickle.dump(iter_dict, open("iter_dict.pickle", "wb"))
+        # Run all other methods (iterations are independent, each with its own random seed)
+        seeds = np.random.randint(2**31 - 1, size=iterations)
+        iteration_results = Parallel(n_jobs=n_jobs)(delayed(self.run_iteration)(j, seeds[j], ssnmf_tol, nmf_tol, i_nmf_tol, lamb, ka, itas, \
+                                                                              print_results=print_results, device=device, n_threads=n_threads, \
+                                                                              nnls_solver=nnls_solver) for j in range(iterations))
+        for j, results in enumerate(iteration_results):
+            for model, res in results.items():
+                acc_dict[model][j] = res["acc"]
+                if "iter" in res:
+                    iter_dict[model][j] = res["iter"]
+                for key, dictionary in [("A", A_dict), ("B", B_dict), ("S", S_dict), ("S_test", S_test_dict), ("Yhat", Yhat_dict)]:
+                    if key in res:
+                        dictionary[model].append(res[key])
+
+        # Save all dictionaries (once, after all iterations)
+        for name, dictionary in [("acc_dict", acc_dict), ("A_dict", A_dict), ("B_dict", B_dict), ("S_dict", S_dict), \
+                                 ("S_test_dict", S_test_dict), ("Yhat_dict", Yhat_dict), ("iter_dict", iter_dict)]:
+            with open(name + ".pickle", "wb") as f:
+                pickle.dump(dictionary, f, protocol=pickle.HIGHEST_PROTOCOL)
 
         # Report average performance for models
         print("\n\nPrinting mean + std accuracy results...")
         print("---------------------------------------\n")
         for i in range(3,7):
             acc = acc_dict["Model" + str(i)]
-            print("Model {} average accuracy: {:.4f} ± {:.4f}.".format(i,mean(acc),stdev(acc)))
+            print("Model {} average accuracy: {:.4f} ± {:.4f}.".format(i,acc.mean(),acc.std(ddof=1)))
         acc = acc_dict["NMF"]
-        print("NMF average accuracy: {:.4f} ± {:.4f}.".format(mean(acc),stdev(acc)))
+        print("NMF average accuracy: {:.4f} ± {:.4f}.".format(acc.mean(),acc.std(ddof=1)))
         acc = acc_dict["I_NMF"]
-        print("I_NMF average accuracy: {:.4f} ± {:.4f}.".format(mean(acc),stdev(acc)))
+        print("I_NMF average accuracy: {:.4f} ± {:.4f}.".format(acc.mean(),acc.std(ddof=1)))
         acc = acc_dict["NB"][0]
         print("NB accuracy: {:.4f}.".format(acc))
         acc = acc_dict["SVM"]
-        print("SVM average accuracy: {:.4f} ± {:.4f}.".format(mean(acc),stdev(acc)))
+        print("SVM average accuracy: {:.4f} ± {:.4f}.".format(acc.mean(),acc.std(ddof=1)))
 
         # Report average number of iterations (mult. updates) for models
         print("\n\nPrinting mean number of iterations (multiplicative updates)...")
         print("----------------------------------------------------------------\n")
         for i in range(3,7):
             iter_list = iter_dict["Model" + str(i)]
-            print("Model {} average number of iterations: {:.2f}.".format(i,mean(iter_list)))
+            print("Model {} average number of iterations: {:.2f}.".format(i,iter_list.mean()))
         iter_list = iter_dict["NMF"]
-        print("NMF average number of iterations: {:.2f}.".format(mean(iter_list)))
+        print("NMF average number of iterations: {:.2f}.".format(iter_list.mean()))
         iter_list = iter_dict["I_NMF"]
-        print("I_NMF average number of iterations: {:.2f}.".format(mean(iter_list)))
+        print("I_NMF average number of iterations: {:.2f}.".format(iter_list.mean()))
 
         # Find median performance for models
         print("\n\nPrinting median accuracy results...")
@@ -384,26 +455,28 @@ class Methods:
         median_dict = {}
         for i in range(3,7):
             acc = acc_dict["Model" + str(i)]
-            median_dict["Model" + str(i)] = np.argsort(acc)[len(acc)//2]
-            print("Model {} median accuracy: {:.4f}.".format(i,median(acc)))
+            median_dict["Model" + str(i)] = np.argpartition(acc, len(acc)//2)[len(acc)//2]
+            print("Model {} median accuracy: {:.4f}.".format(i,np.median(acc)))
 
         acc = acc_dict["NMF"]
-        median_dict["NMF"] = np.argsort(acc)[len(acc)//2]
-        print("NMF median accuracy: {:.4f}.".format(median(acc)))
+        median_dict["NMF"] = np.argpartition(acc, len(acc)//2)[len(acc)//2]
+        print("NMF median accuracy: {:.4f}.".format(np.median(acc)))
 
         acc = acc_dict["I_NMF"]
-        median_dict["I_NMF"] = np.argsort(acc)[len(acc)//2]
-        print("I_NMF median accuracy: {:.4f}.".format(median(acc)))
+        median_dict["I_NMF"] = np.argpartition(acc, len(acc)//2)[len(acc)//2]
+        print("I_NMF median accuracy: {:.4f}.".format(np.median(acc)))
 
         acc = acc_dict["NB"][0]
         print("NB accuracy: {:.4f}.".format(acc))
 
         acc = acc_dict["SVM"]
-        median_dict["SVM"] = np.argsort(acc)[len(acc)//2]
-        print("SVM median accuracy: {:.4f}.".format(median(acc)))
+        median_dict["SVM"] = np.argpartition(acc, len(acc)//2)[len(acc)//2]
+        print("SVM median accuracy: {:.4f}.".format(np.median(acc)))
 
-        pickle.dump(median_dict, open("median_dict.pickle", "wb"))
-        pickle.dump([ssnmf_tol, nmf_tol, lamb, ka, itas, iterations, hyp_search], open("param_list.pickle", "wb"))
+        with open("median_dict.pickle", "wb") as f:
+            pickle.dump(median_dict, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open("param_list.pickle", "wb") as f:
+            pickle.dump([ssnmf_tol, nmf_tol, lamb, ka, itas, iterations, hyp_search], f, protocol=pickle.HIGHEST_PROTOCOL)
 
         return acc_dict, A_dict, B_dict, S_dict, S_test_dict, Yhat_dict, median_dict, iter_dict
 
@@ -411,12 +484,12 @@ class Methods:
         """
         Print classification reports, heatmaps (if applicable), and keywords of the median model results.
         Args:
-            acc_dict (dictionary): for each model, test accuracy for each iteration (list)
+            acc_dict (dictionary): for each model, test accuracy for each iteration (ndarray)
             A_dict (dictionary): for each model, word dictionary matrices for each iteration (list) (if applicable)
             B_dict (dictionary): for each model, classification dictionary matrices for each iteration (list) (if applicable)
             Yhat_dict (dictionary): for each model, predicted labels for each iteration (list)
             median_dict (dictionary): for each model, indices of the median model for each model based on test accuracy
-            iter_dict (dictionary): for each model, number of multiplicative updates for each iteration (list) (if applicable)
+            iter_dict (dictionary): for each model, number of multiplicative updates for each iteration (ndarray) (if applicable)
         """
 
         print("\n\nPrinting classification report, keywords, and heatmaps for median model results.")
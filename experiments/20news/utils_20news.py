@@ -1,6 +1,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from joblib import Parallel, delayed
+try:
+    from numba import njit, prange, config, get_num_threads, set_num_threads
+except ImportError: # numba is optional, the exact nnls solver then runs in joblib processes
+    njit = None
+    prange = range
 plt.ion()
 
 def top_features(classifier, feature_names, cls_names, top_num):
@@ -53,6 +59,44 @@ def factors_heatmaps(B, cls_names = [], save=False, filepath = None):
         plt.savefig(filepath, bbox_inches='tight')
     #plt.show()
 
+def onehot_encode(labels, classes):
+    """
+    One-hot encode a label vector.
+    Args:
+        labels (ndarray): labels of all documents, shape (documents,)
+        classes (ndarray): sorted array of all class labels
+    Returns:
+        Y (ndarray): binary label matrix where 1 in the (i,j) entry indicates that document j belongs to class i,
+                     shape (classes, documents)
+    """
+    Y = np.zeros((len(classes), len(labels)))
+    Y[np.searchsorted(classes, labels), np.arange(len(labels))] = 1
+
+    return Y
+
+def predict_classes(B, S, block_size=None, dtype=np.float64, cache_size=2**20):
+    """
+    Compute the index of the largest entry of each column of B @ S block by block, so that the full
+    (classes, documents) product is never formed.
+    Args:
+        B (ndarray): classification dictionary matrix, shape (classes, topics)
+        S (ndarray): document representation matrix, shape (topics, documents)
+        block_size (int): number of documents per block (default is the largest block for which the blocks of
+                          S and B @ S fill at most half of cache_size, so the product stays in cache for the argmax)
+        dtype (type): floating point type of the product
+        cache_size (int): (L2) cache size in bytes used to choose the default block_size
+    Returns:
+        pred (ndarray): index of the predicted class of each document, shape (documents,)
+    """
+    if block_size is None:
+        block_size = max(1, (cache_size//2)//((B.shape[0] + B.shape[1])*np.dtype(dtype).itemsize))
+    B = B.astype(dtype, copy=False)
+    pred = np.empty(S.shape[1], dtype=np.intp)
+    for s in range(0, S.shape[1], block_size):
+        np.argmax(B @ S[:, s:s+block_size].astype(dtype, copy=False), axis=0, out=pred[s:s+block_size])
+
+    return pred
+
 def TopicVsDoc(S):
     """
     This function associates a topic to each document (one-hot encode).
@@ -182,3 +226,152 @@ def dictupdateIdiv(Z, D, R, M, eps):
     '''
     return np.multiply(np.divide(D, eps + M @ np.transpose(R)), \
                        np.multiply(np.divide(np.multiply(M, Z), eps + np.multiply(M, D @ R)), M) @ np.transpose(R))
+
+def nnls_fpgm(W, X, tol=1e-6, max_iter=500):
+    """
+    Solve the nonnegative least squares problems min_{h >= 0} ||x - Wh||_2 for all columns x of X
+    simultaneously with the fast projected gradient method (accelerated, FISTA-type recurrence).
+    Args:
+        W (ndarray): fixed dictionary matrix, shape (words, topics)
+        X (ndarray or sparse matrix): data matrix whose columns are the right-hand sides, shape (words, documents)
+        tol (float): tolerance on the relative change of the iterates for terminating the method
+        max_iter (int): maximum number of iterations
+    Returns:
+        H (ndarray): nonnegative representation matrix, shape (topics, documents)
+    """
+    WtW = W.T @ W
+    WtX = np.asarray((X.T @ W).T) # dense, also for sparse X
+    L = np.linalg.eigvalsh(WtW)[-1] # Lipschitz constant of the gradient
+
+    H = np.zeros((W.shape[1], X.shape[1]))
+    P = H.copy()
+    c_prev = 1
+    for k in range(max_iter):
+        H_new = np.maximum(0, P - (WtW @ P - WtX)/L)
+        c = (1 + np.sqrt(1 + 4*c_prev**2))/2
+        P = H_new + ((c_prev - 1)/c)*(H_new - H)
+        diff = np.linalg.norm(H_new - H)
+        H = H_new
+        c_prev = c
+        if diff <= tol*max(np.linalg.norm(H), np.finfo(float).eps):
+            break
+
+    return H
+
+def fnnls(AtA, Atb, tol=1e-10, max_iter=None):
+    """
+    Fast nonnegative least squares (Bro and de Jong) for min_{h >= 0} ||x - Wh||_2, stated on the
+    normal equations so that AtA = W.T @ W can be computed once and shared by many right-hand sides.
+    Args:
+        AtA (ndarray): Gram matrix of the dictionary, shape (topics, topics)
+        Atb (ndarray): product of the transposed dictionary and the data vector, shape (topics,)
+        tol (float): tolerance on the dual variables (Lagrange multipliers)
+        max_iter (int): maximum number of inner iterations (default is 3 * topics)
+    Returns:
+        x (ndarray): nonnegative solution vector, shape (topics,)
+    """
+    n = Atb.shape[0]
+    if max_iter is None:
+        max_iter = 3*n
+
+    P = np.zeros(n, dtype=np.bool_) # passive set
+    x = np.zeros(n)
+    s = np.zeros(n)
+    w = Atb.copy()
+    it = 0
+    while (not P.all()) and np.max(np.where(P, -np.inf, w)) > tol:
+        P[np.argmax(np.where(P, -np.inf, w))] = True
+        s[:] = 0
+        s[P] = np.linalg.solve(AtA[P][:,P], Atb[P])
+        while P.any() and np.min(s[P]) <= 0 and it < max_iter:
+            it += 1
+            Q = P & (s <= 0)
+            alpha = np.min(x[Q]/(x[Q] - s[Q]))
+            x = x + alpha*(s - x)
+            P = P & (x > tol)
+            s[:] = 0
+            if P.any():
+                s[P] = np.linalg.solve(AtA[P][:,P], Atb[P])
+        x = s.copy()
+        w = Atb - AtA @ x
+
+    return x
+
+def nnls_chunk(WtW, WtX):
+    """
+    Solve the exact nonnegative least squares problem min_{h >= 0} ||x - Wh||_2 for each column x of X,
+    given the precomputed products WtW = W.T @ W and WtX = W.T @ X.
+    Args:
+        WtW (ndarray): Gram matrix of the dictionary, shape (topics, topics)
+        WtX (ndarray): product of the transposed dictionary and the data matrix, shape (topics, documents)
+    Returns:
+        H (ndarray): nonnegative representation matrix, shape (topics, documents)
+    """
+    H = np.zeros(WtX.shape)
+    for i in prange(WtX.shape[1]):
+        H[:,i] = fnnls(WtW, WtX[:,i])
+
+    return H
+
+if njit is not None:
+    # Compile the exact nnls solver, nnls_chunk then solves the columns in parallel threads
+    fnnls = njit(cache=True)(fnnls)
+    nnls_chunk = njit(parallel=True, cache=True)(nnls_chunk)
+    # nnls_columns is called from the model threads of Methods.run_iteration; the tbb threading layer hangs at
+    # interpreter exit once it was launched from a thread other than the main one, so omp or workqueue is preferred
+    config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
+def nnls_columns(W, X, n_jobs=-1, chunk_size=256):
+    """
+    Solve the exact nonnegative least squares problems for all columns of X in parallel. W.T @ W and
+    W.T @ X are computed once up front. If numba is installed, the columns are solved by the compiled
+    solver in n_jobs parallel threads; otherwise they are split into chunks of chunk_size documents so that
+    each joblib task amortizes the dispatch overhead. With numba, the first call in a fresh environment
+    blocks for the JIT compilation of the solver (about 16 s); the compiled code is cached on disk, so
+    later calls and runs start immediately.
+    Args:
+        W (ndarray): fixed dictionary matrix, shape (words, topics)
+        X (ndarray or sparse matrix): data matrix whose columns are the right-hand sides, shape (words, documents)
+        n_jobs (int): number of parallel threads (numba) or processes (joblib); negative values count back from all
+                      cores as in joblib (-1 uses all cores, -2 all but one, ...)
+        chunk_size (int): number of columns solved per task, only used without numba
+    Returns:
+        H (ndarray): nonnegative representation matrix, shape (topics, documents)
+    """
+    if n_jobs == 0:
+        raise ValueError('n_jobs == 0 has no meaning.')
+    WtW = W.T @ W
+    WtX = np.asarray((X.T @ W).T) # dense, also for sparse X
+    if njit is not None:
+        # Map n_jobs onto the numba threads the way joblib maps it onto cores
+        max_threads = config.NUMBA_NUM_THREADS
+        prev_threads = get_num_threads()
+        set_num_threads(min(n_jobs, max_threads) if n_jobs > 0 else max(1, max_threads + 1 + n_jobs))
+        try:
+            return nnls_chunk(WtW, np.ascontiguousarray(WtX))
+        finally:
+            set_num_threads(prev_threads)
+    chunks = Parallel(n_jobs=n_jobs, backend='loky')(delayed(nnls_chunk)(WtW, WtX[:,s:s+chunk_size]) \
+                                                    for s in range(0, WtX.shape[1], chunk_size))
+
+    return np.concatenate(chunks, axis=1)
+
+def repupdateIdiv(Z, D, R, eps):
+    """
+    Multiplicative update for R in D(Z||DR) with a fixed dictionary D and no missing data. The update
+    is done in place and reuses a single buffer for DR, so that no mask matrix is formed or multiplied.
+    Args:
+        Z (ndarray): data matrix, shape (words, documents)
+        D (ndarray): fixed left factor matrix of Z, shape (words, topics)
+        R (ndarray): right factor matrix of Z, shape (topics, documents)
+        eps (float): epsilon value to prevent division by zero
+    Returns:
+        R (ndarray): updated right factor matrix (same array as the input R)
+    """
+    DR = D @ R
+    DR += eps
+    np.divide(Z, DR, out=DR)
+    R *= D.T @ DR
+    R /= D.sum(axis=0)[:,None] + eps
+
+    return R
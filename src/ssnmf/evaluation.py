@@ -3,7 +3,8 @@
 
 import numpy as np
 from numpy import linalg as la
-import scipy.optimize.nnls as nnls
+from scipy.optimize import nnls
+import torch
 
 import ssnmf.ssnmf
 
@@ -64,18 +65,27 @@ class Evaluation:
     iter_s         : int_, optional
                      Number of iterations of updates to run to approximate the representation of the test
                      data when the I-divervene a discrepancy measure for data reconstruction (default is 10).
+    device         : str_ or torch.device, optional
+                     If given (e.g. 'cuda'), the model is trained with the PyTorch implementation on this device,
+                     keeping all factors on the device across the multiplicative updates; the learnt factors are
+                     copied back to numpy arrays after training. The factors keep the (float64) precision of the
+                     numpy path, only the saved train errors are float32 (the default is None, i.e. train with numpy).
 
 
     Methods
     ----------
     eval()
         Fits (S)SNMF model to the train data, and evaluates the performance on the train and test data.
+    train_device()
+        Fits (S)SNMF model to the train data with the PyTorch implementation on a given device.
     test_model()
         Compute the representation of the test data given a trained model.
     computeErrors(W)
         Compute the errors of the model on test data.
     iterativeLocalSearch()
         Perform an iterative local search in hyperparameter space for a set of (locally) optimal (k,lambda,iterations).
+    successiveHalvingSearch()
+        Perform a randomized search with successive halving in hyperparameter space for a set of (k,lambda,iterations).
 
 
     Usage Example
@@ -127,6 +137,7 @@ class Evaluation:
         self.numiters = kwargs.get('numiters',10)
         self.tol = kwargs.get('tol', 1e-4)
         self.iter_s = kwargs.get('iter_s', 20)
+        self.device = kwargs.get('device', None)
         self.A = kwargs.get('A',np.random.rand(self.rows,k)) #initialize factor A
         self.S = kwargs.get('S',np.random.rand(k,self.cols)) #initialize factor S
         self.B = kwargs.get('B', np.random.rand(self.classes, k)) #initialize factor B
@@ -181,7 +192,10 @@ class Evaluation:
                                 float(classification accuracy on test data)]
         '''
         # Fit (S)SNMF model to train data
-        train_evals = self.model.mult(numiters = self.numiters, saveerrs = True) #save train data errors
+        if self.device is None:
+            train_evals = self.model.mult(numiters = self.numiters, saveerrs = True) #save train data errors
+        else:
+            train_evals = self.train_device()
         # Apply (S)SNMF model to test data
         self.S_test = self.test_model() #representation matrix of test data
         # Compute reconstruction errors on test data
@@ -190,6 +204,27 @@ class Evaluation:
         return train_evals, test_evals
 
 
+    def train_device(self):
+        '''
+        This function fits the (S)SNMF model to the train data with the PyTorch implementation on self.device, and
+        copies the learnt factors back to the (numpy) model.
+
+        Returns:
+            train_evals (list): train data errors and accuracies for each iteration (see eval()), as ndarrays
+        '''
+        to_device = lambda M: torch.as_tensor(M, device=self.device)
+        # SSNMF_T is used directly, the SSNMF class would resolve the update rules to the numpy implementation
+        model = ssnmf.ssnmf.SSNMF_T(X = to_device(self.model.X), k = self.k, modelNum = self.modelNum, Y = to_device(self.model.Y), \
+                                        W = to_device(self.model.W), L = to_device(self.model.L), A = to_device(self.model.A), \
+                                        B = to_device(self.model.B), S = to_device(self.model.S), lam = self.lam, tol = self.tol)
+        train_evals = model.mult(numiters = self.numiters, saveerrs = True) #save train data errors
+
+        self.model.A = model.A.cpu().numpy()
+        self.model.B = model.B.cpu().numpy()
+        self.model.S = model.S.cpu().numpy()
+
+        return [errs.cpu().numpy() for errs in train_evals]
+
     def test_model(self):
         '''
         Given a trained (S)SNMF model i.e. learned data dictionary, A, the function applies the (S)SNMF model
@@ -294,7 +329,7 @@ class Evaluation:
                                 test_features = self.test_features, test_labels = self.test_labels,\
                                 modelNum = self.modelNum, k = self.k, lam=self.lam, numiters = self.numiters,\
                                 W_train = self.W_train, W_test= self.W_test,\
-                                L = self.L, tol = self.tol, iter_s = self.iter_s)
+                                L = self.L, tol = self.tol, iter_s = self.iter_s, device = self.device)
 
         train_evals, test_evals = eval_module.eval()
         self.cls_last = test_evals[-1]
@@ -324,7 +359,7 @@ class Evaluation:
                                                 test_features = self.test_features, test_labels = self.test_labels,\
                                                 modelNum = self.modelNum, k = k, lam=la, numiters = it, \
                                                 W_train = self.W_train, W_test= self.W_test,\
-                                                L = self.L, tol = self.tol, iter_s = self.iter_s)
+                                                L = self.L, tol = self.tol, iter_s = self.iter_s, device = self.device)
                         train_evals, test_evals = eval_module.eval()
                         if(test_evals[-1] > best_local_acc):
                             best_ka = k
@@ -337,7 +372,7 @@ class Evaluation:
                                     test_features = self.test_features, test_labels = self.test_labels,\
                                     modelNum = self.modelNum, k = best_ka, lam=best_lamb, numiters = best_itas,\
                                     W_train = self.W_train, W_test= self.W_test,\
-                                    L = self.L, tol = self.tol, iter_s = self.iter_s)
+                                    L = self.L, tol = self.tol, iter_s = self.iter_s, device = self.device)
             train_evals, test_evals = eval_module.eval()
             cls_current = test_evals[-1]
 
@@ -380,4 +415,77 @@ class Evaluation:
                 print("Final val classification accuracy: {}".format(self.cls_last))
 
 
+        return self.lam, self.k, self.numiters
+
+    def successiveHalvingSearch(self, init_lamb, init_k, init_itas, **kwargs):
+        """
+        This function performs a randomized search with successive halving in hyperparameter space for a set of
+        (k,lambda,iterations). A set of candidates (k,lambda) is sampled from the local search box around the
+        initialization. All candidates are trained for a small number of multiplicative updates; then the worse half
+        (by classification accuracy on the validation set) is discarded, and the surviving models continue training
+        from their current factors for twice as many updates. This repeats until the maximum number of iterations
+        (init_itas) is reached, so the best candidate is always trained for the full budget. The candidates are all
+        trained on the data of this object's model, only their factors (A, S, B) are kept between rounds; the model is
+        left at the factors of the best one.
+
+        Several hard-coded choices were made to ease the user-required knowledge of the search algorithm itself.
+        These are for example:
+            - The size of the search box is (k-1 , k+2) x (0.1*lam , 10*lam), lambda is sampled log-uniformly.
+            - The initialization (init_k, init_lamb) is always one of the candidates.
+
+        Args:
+            init_lamb (float): initialization of the regualrizer lambda
+            init_k (int): initialization of the rank
+            init_itas (int): maximum number of iterations
+            num_candidates (int, optional): number of sampled candidates (default is 16)
+            min_itas (int, optional): number of iterations of the first round (default is max(1, init_itas//8))
+
+        Returns:
+            lamb (float): optimal regualrizer lambda found in the search
+            ka (int): optimal number of topics found in the search
+            itas (int): number of iterations the optimal model was trained for
+        """
+        num_candidates = kwargs.get('num_candidates', 16)
+        itas = kwargs.get('min_itas', max(1, init_itas//8))
+
+        if init_k <2:
+            raise Exception('The initialization of the number of topics should be at least 2.')
+
+        # Sample candidates (k, lambda); only their factors are stored, all candidates are trained on the data
+        # matrices of this object's model
+        ks = np.concatenate(([init_k], np.random.randint(max(2, init_k-1), init_k+2, size=num_candidates-1)))
+        lams = np.concatenate(([init_lamb], init_lamb*10**np.random.uniform(-1, 1, size=num_candidates-1)))
+        candidates = [{'k': int(k), 'lam': la, 'A': np.random.rand(self.rows, k), 'S': np.random.rand(k, self.cols), \
+                       'B': np.random.rand(self.classes, k)} for k, la in zip(ks, lams)]
+
+        trained = 0
+        while True:
+            # Continue training all surviving candidates from their current factors
+            accs = []
+            for cand in candidates:
+                self.k, self.lam, self.numiters = cand['k'], cand['lam'], itas - trained
+                self.model.A, self.model.S, self.model.B, self.model.lam = cand['A'], cand['S'], cand['B'], cand['lam']
+                train_evals, test_evals = self.eval()
+                cand['A'], cand['S'], cand['B'] = self.model.A, self.model.S, self.model.B
+                accs.append(test_evals[-1])
+                print("Currently testing k = {}, iteration = {}, and lambda = {}: val classification accuracy {}".format(\
+                        cand['k'], itas, cand['lam'], test_evals[-1]))
+            trained = itas
+
+            if itas >= init_itas:
+                break
+
+            # Keep the better half of the candidates (a single one keeps training) and double the number of iterations
+            order = np.argsort(accs)[::-1]
+            candidates = [candidates[i] for i in order[:max(1, len(candidates)//2)]]
+            itas = min(2*itas, init_itas)
+
+        # Leave the model at the best candidate
+        best = candidates[int(np.argmax(accs))]
+        self.lam, self.k, self.numiters = best['lam'], best['k'], itas
+        self.model.A, self.model.S, self.model.B, self.model.lam = best['A'], best['S'], best['B'], best['lam']
+        print("The set of hyperparameters found were:")
+        print("k =", self.k, "; iter =", self.numiters, "; lam =", self.lam)
+        print("Final val classification accuracy: {}".format(np.max(accs)))
+
         return self.lam, self.k, self.numiters
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from ssnmf.evaluation import Evaluation
+
+
+def make_data(seed=0, rows=30, classes=3, n_train=40, n_test=20):
+    rng = np.random.RandomState(seed)
+    def split(n):
+        labels = rng.randint(classes, size=n)
+        features = rng.rand(rows, classes)[:, labels] + 0.1 * rng.rand(rows, n)
+        return features, np.eye(classes)[:, labels]
+    train_features, train_labels = split(n_train)
+    test_features, test_labels = split(n_test)
+    return dict(train_features=train_features, train_labels=train_labels,
+                test_features=test_features, test_labels=test_labels)
+
+
+@pytest.mark.parametrize("modelNum", [3, 4, 5, 6])
+def test_eval_device_matches_numpy(modelNum):
+    data = make_data()
+    results = []
+    for device in [None, 'cpu']:
+        np.random.seed(1)
+        eval_module = Evaluation(**data, modelNum=modelNum, k=3, lam=10, numiters=15, tol=0, device=device)
+        results.append((eval_module.eval(), eval_module.model))
+    (train_np, test_np, model_np), (train_dev, test_dev, model_dev) = [r[0] + (r[1],) for r in results]
+
+    assert len(train_dev) == len(train_np)
+    for errs_np, errs_dev in zip(train_np, train_dev):
+        assert isinstance(errs_dev, np.ndarray)
+        assert errs_dev.shape == errs_np.shape
+    for M in ['A', 'S', 'B']:
+        factor_np, factor_dev = getattr(model_np, M), getattr(model_dev, M)
+        assert isinstance(factor_dev, np.ndarray)
+        assert factor_dev.dtype == factor_np.dtype == np.float64
+        assert factor_dev.shape == factor_np.shape
+        assert np.allclose(factor_dev, factor_np)
+    assert len(test_dev) == len(test_np)
+    assert np.allclose(test_dev, test_np)
+
+
+def test_successive_halving_search():
+    data = make_data()
+    np.random.seed(2)
+    eval_module = Evaluation(**data, modelNum=3, k=3, lam=10, numiters=16, tol=0)
+    lam, k, itas = eval_module.successiveHalvingSearch(init_lamb=10, init_k=3, init_itas=16, num_candidates=4)
+
+    assert isinstance(k, int) and 2 <= k <= 4
+    assert 1 <= lam <= 100
+    assert itas == 16
+    assert (eval_module.k, eval_module.lam, eval_module.numiters) == (k, lam, itas)
+    assert eval_module.model.A.shape == (30, k)
+    assert eval_module.model.S.shape == (k, 60)
+    assert eval_module.model.B.shape == (3, k)
+
+    with pytest.raises(Exception):
+        eval_module.successiveHalvingSearch(init_lamb=10, init_k=1, init_itas=16)